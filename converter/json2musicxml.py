@@ -70,7 +70,8 @@ def main():
     parser.add_argument('--debug', action='store_true', help='启用调试模式')
     
     args = parser.parse_args()
-    setup_logging(args.debug)
+    # 指定调试小节时同样需要DEBUG级别日志才能看到小节信息
+    setup_logging(args.debug or bool(args.debug_measures))
     
     try:
         # 创建调试器（如果指定了debug_measures）
@@ -266,14 +266,18 @@ class EnhancedScoreComparator:
         """增强的和弦比较，包含详细的时值比较"""
         differences = {}
         
+        # pitches 每次访问都会重新生成元组，取一次即可
+        pitches1 = chord1.pitches
+        pitches2 = chord2.pitches
+        
         # 比较和弦音符数量
-        if len(chord1.pitches) != len(chord2.pitches):
-            differences["pitch_count"] = (len(chord1.pitches), len(chord2.pitches))
+        if len(pitches1) != len(pitches2):
+            differences["pitch_count"] = (len(pitches1), len(pitches2))
             return differences
         
         # 比较每个音高（考虑等音）
-        pitches1 = sorted(chord1.pitches, key=lambda p: p.midi)
-        pitches2 = sorted(chord2.pitches, key=lambda p: p.midi)
+        pitches1 = sorted(pitches1, key=lambda p: p.midi)
+        pitches2 = sorted(pitches2, key=lambda p: p.midi)
         
         pitch_differences = []
         for i, (p1, p2) in enumerate(zip(pitches1, pitches2)):
@@ -3,6 +3,14 @@ from enum import Enum
 from typing import List, Optional
 import music21
 import json
+import logging
+
+try:
+    import orjson  # 可选依赖，解析大型JSON明显更快
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
 
 # 全局常量
 TIME_SIGNATURE = "4/4"  
@@ -46,7 +54,21 @@ class Position:
     y: float
     beats: float
 
-@dataclass
+# Note.from_json 读取的字段及其两种命名风格 (snake_case, camelCase)
+_NOTE_FIELD_NAMES = (
+    ('pitch_name', 'pitchName'),
+    ('duration_beats', 'durationBeats'),
+    ('duration_seconds', 'durationSeconds'),
+    ('duration_type', 'durationType'),
+    ('position_beats', 'positionBeats'),
+    ('position_seconds', 'positionSeconds'),
+    ('pitch_midi_note', 'pitchMidiNote'),
+    ('tie_type', 'tieType'),
+    ('accidental', 'accidentalType'),
+    ('accidental_cautionary', 'accidentalCautionary'),
+)
+
+@dataclass(slots=True)
 class Note:
     """音符数据模型"""
     # snake_case参数（必需）
@@ -152,60 +174,40 @@ class Note:
     @classmethod
     def from_json(cls, note_data: dict) -> 'Note':
         """从JSON数据创建Note实例，支持两种命名风格"""
-        # 创建命名风格映射
-        field_mapping = {
-            'pitch_name': ['pitch_name', 'pitchName'],
-            'duration_beats': ['duration_beats', 'durationBeats'],
-            'duration_seconds': ['duration_seconds', 'durationSeconds'],
-            'duration_type': ['duration_type', 'durationType'],
-            'position_beats': ['position_beats', 'positionBeats'],
-            'position_seconds': ['position_seconds', 'positionSeconds'],
-            'pitch_midi_note': ['pitch_midi_note', 'pitchMidiNote'],
-            'tie_type': ['tie_type', 'tieType'],
-            'accidental': ['accidental', 'accidentalType'],
-            'accidental_cautionary': ['accidental_cautionary', 'accidentalCautionary']
+        # 每个字段取第一个存在的名称（snake_case优先）
+        fields = {
+            snake_case: note_data[snake_case] if snake_case in note_data else note_data.get(camel_case)
+            for snake_case, camel_case in _NOTE_FIELD_NAMES
         }
 
-        # 获取数据，支持两种命名风格
-        def get_value(field_names):
-            for name in field_names:
-                if name in note_data:
-                    return note_data[name]
-            return None
-
-        y = note_data.get('y', 0.0)
+        get = note_data.get
+        y = get('y', 0.0)
         # 根据y坐标确定所属谱表
         staff = ClefType.TREBLE.value if y > STAFF_SPLIT_Y else ClefType.BASS.value
 
-        # 增加chord属性解析
-        is_chord = note_data.get('is_chord', False)
-
-        # 创建Note实例时只使用snake_case参数名
         return cls(
-            staff=staff,  # 包含 staff 参数
-            pitch_name=get_value(field_mapping['pitch_name']),
-            duration_beats=get_value(field_mapping['duration_beats']),
-            duration_seconds=get_value(field_mapping['duration_seconds']),
-            duration_type=get_value(field_mapping['duration_type']),
-            position_beats=get_value(field_mapping['position_beats']),
-            position_seconds=get_value(field_mapping['position_seconds']),
-            width=note_data.get('width', 0.0),
-            height=note_data.get('height', 0.0),
-            x=note_data.get('x', 0.0),
+            width=get('width', 0.0),
+            height=get('height', 0.0),
+            x=get('x', 0.0),
             y=y,
-            dots=note_data.get('dots', 0),
-            pitch_midi_note=get_value(field_mapping['pitch_midi_note']),
-            tie_type=get_value(field_mapping['tie_type']),
-            is_chord=is_chord,
-            accidental=get_value(field_mapping['accidental']),
-            accidental_cautionary=get_value(field_mapping['accidental_cautionary'])
+            staff=staff,
+            dots=get('dots', 0),
+            is_chord=get('is_chord', False),  # chord属性
+            **fields
         )
 
     def to_dict(self) -> dict:
         """转换为字典"""
         return asdict(self)
 
-@dataclass
+# Measure.from_json 读取的字段及其两种命名风格 (snake_case, camelCase)
+_MEASURE_FIELD_NAMES = (
+    ('staff_distance', 'staffDistance'),
+    ('start_position_beats', 'startPositionBeats'),
+    ('start_position_seconds', 'startPositionSeconds'),
+)
+
+@dataclass(slots=True)
 class Measure:
     """小节数据模型"""
     # 必需参数
@@ -245,46 +247,22 @@ class Measure:
     @classmethod
     def from_json(cls, measure_data: dict) -> 'Measure':
         """从JSON数据创建Measure实例，支持两种命名风格"""
-        # 首先转换所有可能的camelCase键为snake_case
-        converted_data = {}
-        
-        # 基本字段的直接映射
-        direct_fields = ['number', 'height', 'width', 'x', 'y']
-        for field in direct_fields:
-            if field in measure_data:
-                converted_data[field] = measure_data[field]
-            elif field.lower() in measure_data:  # 处理可能的大小写差异
-                converted_data[field] = measure_data[field.lower()]
-
-        # 特殊字段的映射
-        field_mapping = {
-            'staff_distance': ['staff_distance', 'staffDistance'],
-            'start_position_beats': ['start_position_beats', 'startPositionBeats'],
-            'start_position_seconds': ['start_position_seconds', 'startPositionSeconds']
+        # 每个字段取第一个存在的名称（snake_case优先）
+        fields = {
+            snake_case: measure_data[snake_case] if snake_case in measure_data else measure_data.get(camel_case)
+            for snake_case, camel_case in _MEASURE_FIELD_NAMES
         }
 
-        # 获取数据，支持两种命名风格
-        for snake_case, variants in field_mapping.items():
-            for variant in variants:
-                if variant in measure_data:
-                    converted_data[snake_case] = measure_data[variant]
-                    break
-
-        # 处理notes数组
-        if 'notes' in measure_data:
-            converted_data['notes'] = [Note.from_json(note) for note in measure_data['notes']]
-
-        # 使用转换后的数据创建实例
+        get = measure_data.get
+        note_from_json = Note.from_json
         return cls(
-            number=converted_data.get('number'),
-            height=converted_data.get('height'),
-            staff_distance=converted_data.get('staff_distance'),
-            width=converted_data.get('width'),
-            x=converted_data.get('x'),
-            y=converted_data.get('y'),
-            start_position_beats=converted_data.get('start_position_beats'),
-            start_position_seconds=converted_data.get('start_position_seconds'),
-            notes=converted_data.get('notes', [])
+            number=get('number'),
+            height=get('height'),
+            width=get('width'),
+            x=get('x'),
+            y=get('y'),
+            notes=[note_from_json(note) for note in measure_data['notes']] if 'notes' in measure_data else [],
+            **fields
         )
 
     def get_notes_by_staff(self, clef_type: ClefType) -> List[Note]:
@@ -297,7 +275,7 @@ class Measure:
         data['notes'] = [note.to_dict() for note in self.notes]
         return data
 
-@dataclass
+@dataclass(slots=True)
 class Score:
     """乐谱数据模型"""
     measures: List[Measure]
@@ -388,8 +366,13 @@ class Score:
     def from_json(cls, json_path: str, debug_enabled: bool = False) -> 'Score':
         """从JSON文件创建Score对象"""
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
+            if orjson is not None:
+                # orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，下面的异常处理不变
+                with open(json_path, 'rb') as f:
+                    json_data = orjson.loads(f.read())
+            else:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    json_data = json.load(f)
             
             # 获取文件名（去除路径和扩展名）
             filename = json_path.split('/')[-1].rsplit('.json', 1)[0]
@@ -415,7 +398,7 @@ class Score:
             
             measures_data = json_data.get('measures', [])
             if debug_enabled:
-                print(f"Debug - measures count in JSON: {len(measures_data)}")
+                logger.debug("Debug - measures count in JSON: %d", len(measures_data))
             
             measures = []
             for i, m in enumerate(measures_data):
@@ -425,9 +408,9 @@ class Score:
                     measure = Measure.from_json(m)
                     measures.append(measure)
                     if debug_enabled and i == 0:
-                        print(f"Debug - First measure data: {m}")
+                        logger.debug("Debug - First measure data: %s", m)
                 except Exception as e:
-                    print(f"Debug - Error processing measure {i+1}: {str(e)}")
+                    logger.error("Error processing measure %d: %s", i + 1, e)
                     raise
             
             if not measures:
@@ -1,5 +1,8 @@
 # src/converter.py
-from typing import List, Optional, Tuple
+import logging
+from dataclasses import dataclass, field
+from operator import attrgetter, itemgetter
+from typing import List, Optional, Tuple, Union
 import music21
 from src.constants import (
     Note, Score, ClefType, Measure,
@@ -10,6 +13,123 @@ from src.duration import DurationManager
 import json
 import copy
 
+logger = logging.getLogger(__name__)
+
+# 升降号模板缓存 {(accidental_name, cautionary): music21.pitch.Accidental}
+_ACC_CACHE = {}
+
+
+def _get_accidental(name: str, cautionary: bool) -> music21.pitch.Accidental:
+    """获取升降号对象
+    
+    升降号只有少数几种组合，模板只创建一次，之后返回浅拷贝
+    （Accidental会记录所属的Pitch，不能在音符间直接共享）。
+    """
+    key = (name, cautionary)
+    template = _ACC_CACHE.get(key)
+    if template is None:
+        template = music21.pitch.Accidental(name)
+        if cautionary:
+            # 提示性升降号：总是显示并加括号
+            template.displayType = 'always'
+            template.displayStyle = 'parentheses'
+        _ACC_CACHE[key] = template
+    return copy.copy(template)
+
+
+@dataclass
+class NoteArray:
+    """连音梁分析用的音符列视图
+    
+    按列（SoA）保存分组判断需要的字段，分组逻辑只按下标访问，
+    避免反复查询music21对象的属性；elements保存对应的music21对象，
+    分组确定后才回写beam。
+    """
+    elements: List[Union[music21.note.Note, music21.chord.Chord]] = field(default_factory=list)
+    offset: List[float] = field(default_factory=list)
+    beat_bucket: List[int] = field(default_factory=list)  # 所在整拍（offset取整）
+    duration_type: List[str] = field(default_factory=list)
+    top_midi: List[int] = field(default_factory=list)   # 最高音（单音即本身）
+    bass_midi: List[int] = field(default_factory=list)  # 最低音（单音即本身）
+    last_midi: List[int] = field(default_factory=list)  # 和弦最后一个音
+    is_chord: List[bool] = field(default_factory=list)
+    has_tie: List[bool] = field(default_factory=list)
+    
+    def __len__(self) -> int:
+        return len(self.elements)
+    
+    def append(self, element: Union[music21.note.Note, music21.chord.Chord]) -> None:
+        """追加一个音符或和弦"""
+        if isinstance(element, music21.chord.Chord):
+            midis = [p.midi for p in element.pitches]
+            self.top_midi.append(max(midis))
+            self.bass_midi.append(element.bass().midi)
+            self.last_midi.append(midis[-1])
+            self.is_chord.append(True)
+        else:
+            midi = element.pitch.midi
+            self.top_midi.append(midi)
+            self.bass_midi.append(midi)
+            self.last_midi.append(midi)
+            self.is_chord.append(False)
+        self.elements.append(element)
+        self.offset.append(element.offset)
+        self.beat_bucket.append(int(element.offset))
+        self.duration_type.append(element.duration.type)
+        self.has_tie.append(element.tie is not None)
+    
+    @classmethod
+    def from_elements(cls, elements: List[Union[music21.note.Note, music21.chord.Chord]]) -> 'NoteArray':
+        """从music21音符/和弦列表创建"""
+        array = cls()
+        for element in elements:
+            array.append(element)
+        return array
+
+
+@dataclass
+class MelodicState:
+    """分组中旋律进行的增量状态
+    
+    记录旋律线的首音、末音和出现过的音高变化方向（1为上行，2为下行），
+    追加音符时O(1)更新。分组和分组类型分析都使用它判断旋律进行。
+    """
+    line: List[int]  # 按首音选定的旋律线（NoteArray的bass_midi或top_midi列）
+    first_midi: int
+    last_midi: int
+    signs: int = 0
+    length: int = 1
+    
+    @classmethod
+    def start(cls, notes: NoteArray, index: int) -> 'MelodicState':
+        """以指定音符开始新的分组"""
+        # 判断是高音还是低音声部（使用MIDI音高60作为分界线）
+        line = notes.bass_midi if notes.bass_midi[index] < 60 else notes.top_midi
+        midi = line[index]
+        return cls(line=line, first_midi=midi, last_midi=midi)
+    
+    def _signs_with(self, midi: int) -> int:
+        change = midi - self.last_midi
+        return self.signs | (1 if change > 0 else 2 if change < 0 else 0)
+    
+    def is_melodic(self) -> bool:
+        """当前分组是否形成旋律进行"""
+        return (self.length >= 2 and self.signs in (1, 2)
+                and abs(self.last_midi - self.first_midi) <= 24)
+    
+    def is_melodic_with(self, index: int) -> bool:
+        """追加指定音符后是否形成旋律进行"""
+        midi = self.line[index]
+        return self._signs_with(midi) in (1, 2) and abs(midi - self.first_midi) <= 24
+    
+    def append(self, index: int) -> None:
+        """追加音符"""
+        midi = self.line[index]
+        self.signs = self._signs_with(midi)
+        self.last_midi = midi
+        self.length += 1
+
+
 class ScoreConverter:
     """乐谱转换器"""
     
@@ -24,6 +144,8 @@ class ScoreConverter:
             self.debug_measures = debugger.measure_numbers
         # 添加连音线跟踪字典 {(pitch_midi_note, staff_type): music21.note.Note}
         self.tie_starts = {}
+        # 每小节拍数，只解析一次拍号
+        self._beats_per_measure = float(score_data.time_signature.split('/')[0])
     
     def convert(self) -> music21.stream.Score:
         """将JSON格式的乐谱转换为music21格式"""
@@ -39,10 +161,16 @@ class ScoreConverter:
         treble_part.insert(0, music21.clef.TrebleClef())
         bass_part.insert(0, music21.clef.BassClef())
         
+        # 时值调试状态只设置一次，之后仅在调试时逐小节更新当前小节号
+        DurationManager.set_debug_info(
+            debug_measures=self.debug_measures,
+            current_measure=0,
+            debug_enabled=self.debugger is not None
+        )
+        
         # 处理所有小节
         for measure_data in self.score_data.measures:
             treble_measure, bass_measure = self._process_measure(measure_data)
-            
             treble_part.append(treble_measure)
             bass_part.append(bass_measure)
         
@@ -54,21 +182,41 @@ class ScoreConverter:
         
         return score
     
-    def _process_measure(self, measure_data: Measure) -> Tuple[music21.stream.Measure, music21.stream.Measure]:
-        """处理单个小节"""
-        treble_measure = music21.stream.Measure(number=measure_data.number)
-        bass_measure = music21.stream.Measure(number=measure_data.number)
+    def _split_staves(self, measure_data: Measure) -> Tuple[List[Note], List[Note]]:
+        """根据 y 坐标分离高音谱表和低音谱表的音符
         
-        # 根据 y 坐标分离高音谱表和低音谱表的音符
+        单次遍历完成分离，返回的两个列表均已按 position_beats 排序。
+        JSON导出的音符通常已经有序，此时跳过排序。
+        """
         treble_notes = []
         bass_notes = []
+        treble_append = treble_notes.append
+        bass_append = bass_notes.append
         
         for note in measure_data.notes:
             # 使用 STAFF_SPLIT_Y 常量作为分界线
             if note.y >= STAFF_SPLIT_Y:  # y坐标大于分界线的放在高音谱
-                treble_notes.append(note)
+                treble_append(note)
             else:  # y坐标小于分界线的放在低音谱
-                bass_notes.append(note)
+                bass_append(note)
+        
+        return self._sort_by_position(treble_notes), self._sort_by_position(bass_notes)
+    
+    @staticmethod
+    def _sort_by_position(notes: List[Note]) -> List[Note]:
+        """按 position_beats 稳定排序，已有序时直接返回原列表"""
+        for i in range(1, len(notes)):
+            if notes[i].position_beats < notes[i - 1].position_beats:
+                notes.sort(key=attrgetter('position_beats'))
+                break
+        return notes
+    
+    def _process_measure(self, measure_data: Measure) -> Tuple[music21.stream.Measure, music21.stream.Measure]:
+        """处理单个小节"""
+        treble_measure = music21.stream.Measure(number=measure_data.number)
+        bass_measure = music21.stream.Measure(number=measure_data.number)
+        
+        treble_notes, bass_notes = self._split_staves(measure_data)
         
         # 处理高音谱表
         self._fill_staff_measure(
@@ -96,10 +244,12 @@ class ScoreConverter:
             bass_measure.timeSignature = ts
         
         # 只在指定的小节号时输出调试信息
-        if self.debugger and (not self.debug_measures or measure_data.number in self.debug_measures):
-            print(f"Debug: Measure {measure_data.number}")
-            print(f"  Treble: {[(n.nameWithOctave if isinstance(n, music21.note.Note) else 'Rest', n.duration.type, n.duration.dots, n.offset) for n in treble_measure.notes]}")
-            print(f"  Bass: {[(n.nameWithOctave if isinstance(n, music21.note.Note) else 'Rest', n.duration.type, n.duration.dots, n.offset) for n in bass_measure.notes]}")
+        if (self.debugger and logger.isEnabledFor(logging.DEBUG)
+                and (not self.debug_measures or measure_data.number in self.debug_measures)):
+            logger.debug("Debug: Measure %s", measure_data.number)
+            # .notes 只包含音符和和弦（不含休止符），统一按 pitches 输出
+            logger.debug("  Treble: %s", [(' '.join(p.nameWithOctave for p in n.pitches), n.duration.type, n.duration.dots, n.offset) for n in treble_measure.notes])
+            logger.debug("  Bass: %s", [(' '.join(p.nameWithOctave for p in n.pitches), n.duration.type, n.duration.dots, n.offset) for n in bass_measure.notes])
         
         return treble_measure, bass_measure
     
@@ -111,177 +261,90 @@ class ScoreConverter:
         )
         return rest
     
-    def _is_melodic_progression(self, notes: List[music21.note.Note]) -> bool:
-        """检查是否形成旋律进行"""
-        if len(notes) < 2:
-            return False
-            
-        # 判断是高音还是低音声部
-        is_bass = False
-        if isinstance(notes[0], music21.chord.Chord):
-            is_bass = notes[0].bass().midi < 60  # 使用MIDI音高60作为分界线
-        else:
-            is_bass = notes[0].pitch.midi < 60
-            
-        # 获取每个位置的最高或最低音
-        melody_line = []
-        for note in notes:
-            if isinstance(note, music21.chord.Chord):
-                # 根据声部选择最高音或最低音
-                if is_bass:
-                    melody_line.append(note.bass().midi)
-                else:
-                    melody_line.append(max(n.pitch.midi for n in note.notes))
-            else:
-                melody_line.append(note.pitch.midi)
-        
-        # 检查音高变化
-        changes = []
-        for i in range(len(melody_line) - 1):
-            change = melody_line[i+1] - melody_line[i]
-            if change != 0:  # 忽略同音
-                changes.append(change)
-                
-        # 如果没有实际的音高变化，不算是旋律进行
-        if not changes:
-            return False
-            
-        # 检查是否形成连续的上行或下行
-        is_ascending = all(c >= 0 for c in changes)
-        is_descending = all(c <= 0 for c in changes)
-        total_change = abs(melody_line[-1] - melody_line[0])
-        
-        # 总变化不能太大（最大2个八度）
-        return (is_ascending or is_descending) and total_change <= 24
-    
-    def _is_harmonic_progression(self, notes: List[music21.note.Note]) -> bool:
+    def _is_harmonic_progression(self, notes: NoteArray, group: List[int]) -> bool:
         """检查一组音符是否形成和声进行"""
-        if len(notes) < 2:
+        if len(group) < 2:
             return False
             
         # 检查是否都是和弦
-        if not all(isinstance(n, music21.chord.Chord) for n in notes):
+        if not all(notes.is_chord[i] for i in group):
             return False
             
         # 检查最高音是否保持不变
-        top_notes = [n.pitches[-1].midi for n in notes]
-        if not all(p == top_notes[0] for p in top_notes):
-            return False
-            
-        return True
+        first_top = notes.last_midi[group[0]]
+        return all(notes.last_midi[i] == first_top for i in group)
     
-    def _is_tied_chord_pair(self, notes: List[music21.note.Note]) -> bool:
+    def _is_tied_chord_pair(self, notes: NoteArray, group: List[int]) -> bool:
         """检查是否是连音和弦对"""
-        if len(notes) != 2:  # 必须恰好是两个音符/和弦
+        if len(group) != 2:  # 必须恰好是两个音符/和弦
             return False
             
         # 检查是否都是和弦
-        if not all(isinstance(n, music21.chord.Chord) for n in notes):
+        if not all(notes.is_chord[i] for i in group):
             return False
             
-        # 获取两个时间点
-        positions = sorted(set(n.offset for n in notes))
-        if len(positions) != 2:  # 必须是两个不同的时间点
+        # 必须是两个不同的时间点
+        first, second = group
+        if notes.offset[first] == notes.offset[second]:
             return False
             
         # 检查是否有连音
-        has_tie = False
-        for note in notes:
-            if isinstance(note, music21.chord.Chord):
-                if any(hasattr(n, 'tie') and n.tie for n in note.notes):
-                    has_tie = True
-                    break
-            elif hasattr(note, 'tie') and note.tie:
-                has_tie = True
-                break
-                
-        return has_tie
+        return notes.has_tie[first] or notes.has_tie[second]
     
-    def _analyze_beam_group(self, notes: List[music21.note.Note]) -> str:
-        """分析音符组的类型"""
-        if not notes:
+    def _analyze_beam_group(self, notes: NoteArray, group: List[int], melodic: MelodicState) -> str:
+        """分析音符组的类型
+        
+        melodic是分组时为该组累积的旋律状态。
+        """
+        if not group:
             return 'default'
             
         # 检查是否是连音和弦对
-        if len(notes) == 2 and self._is_tied_chord_pair(notes):
+        if len(group) == 2 and self._is_tied_chord_pair(notes, group):
             return 'tied_chord'
             
         # 检查是否是和声进行
-        if self._is_harmonic_progression(notes):
+        if self._is_harmonic_progression(notes, group):
             return 'harmonic'
             
         # 检查是否是旋律进行
-        if self._is_melodic_progression(notes):
+        if melodic.is_melodic():
             return 'melodic'
             
         # 检查是否包含连音
-        has_tie = any(
-            hasattr(n, 'tie') and n.tie 
-            for n in notes 
-            for note in (n.notes if isinstance(n, music21.chord.Chord) else [n])
-        )
-        if has_tie:
+        if any(notes.has_tie[i] for i in group):
             return 'tied'
             
         return 'default'
     
-    def _has_musical_connection(self, current_group: List[music21.note.Note], next_note: music21.note.Note) -> bool:
-        """检查是否存在音乐上的连接关系"""
-        if not current_group:
-            return False
-            
-        # 创建临时组进行分析
-        temp_group = current_group + [next_note]
-        
-        # 1. 检查连音关系
-        has_tie = any(
-            hasattr(n, 'tie') and n.tie 
-            for n in current_group 
-            for note in (n.notes if isinstance(n, music21.chord.Chord) else [n])
-        )
-        if has_tie:
-            return True
-            
-        # 2. 检查和弦连接
-        if len(temp_group) == 2 and self._is_tied_chord_pair(temp_group):
-            return True
-            
-        # 3. 检查旋律进行
-        if self._is_melodic_progression(temp_group):
-            return True
-            
-        # 4. 检查和声进行
-        if self._is_harmonic_progression(temp_group):
-            return True
-            
-        return False
-    
-    def _should_start_new_group(self, current_group: List[music21.note.Note], next_note: music21.note.Note) -> bool:
-        """判断是否应该开始新的分组"""
+    def _should_start_new_group(
+        self,
+        notes: NoteArray,
+        current_group: List[int],
+        next_index: int,
+        melodic: MelodicState
+    ) -> bool:
+        """判断是否应该开始新的分组
+        
+        melodic是current_group的旋律状态，旋律进行的判断不再重新扫描整个分组。
+        """
         if not current_group:
             return False
             
-        # 获取位置信息
-        curr_pos = current_group[-1].offset
-        next_pos = next_note.offset
-        
-        # 1. 检查是否跨越整拍边界
-        if int(curr_pos) != int(next_pos):
+        # 1. 检查是否跨越整拍边界（整拍序号在建立NoteArray时已算好）
+        if notes.beat_bucket[current_group[-1]] ^ notes.beat_bucket[next_index]:
             # 检查是否形成连续的旋律进行
-            temp_group = current_group + [next_note]
-            if not self._is_melodic_progression(temp_group):
+            if not melodic.is_melodic_with(next_index):
                 return True
                 
         # 2. 检查当前组是否已经形成连音和弦对
-        if len(current_group) == 2 and self._is_tied_chord_pair(current_group):
+        if len(current_group) == 2 and self._is_tied_chord_pair(notes, current_group):
             return True
             
         # 3. 检查添加下一个音符是否会破坏现有的音乐模式
-        temp_group = current_group + [next_note]
-        
         # 如果当前组是旋律进行，检查是否保持
         if len(current_group) >= 2:
-            if self._is_melodic_progression(current_group) and not self._is_melodic_progression(temp_group):
+            if melodic.is_melodic() and not melodic.is_melodic_with(next_index):
                 return True
                 
         return False
@@ -295,116 +358,119 @@ class ScoreConverter:
         measure_start: float
     ):
         """填充单个谱表的小节"""
-        # 设置当前小节的调试信息
-        DurationManager.set_debug_info(
-            debug_measures=self.debug_measures,
-            current_measure=measure_number,
-            debug_enabled=self.debugger is not None
-        )
+        # 设置当前小节的调试信息（未启用调试时无需任何处理）
+        if self.debugger:
+            DurationManager.set_current_measure(measure_number)
         
+        beats_per_measure = self._beats_per_measure
         if not notes:
             # 添加全小节休止符
-            beats_per_measure = float(self.score_data.time_signature.split('/')[0])
             rests = DurationManager.create_rest_with_duration(beats_per_measure)
             for rest in rests:
                 measure.append(rest)
             return
 
-        # 创建临时Stream来组织音符
-        temp_stream = music21.stream.Stream()
+        # 先收集 (偏移, 元素)，最后一次性插入小节
+        pending = []
+        add_pending = pending.append
+        min_gap = self.MIN_GAP_THRESHOLD
         last_end_position = 0.0
+        # 插入时顺便收集需要连beam的八分/16分音符（按位置顺序）
+        beam_candidates = []
         
-        # 按位置分组音符
+        # 按位置分组音符（notes已按位置排序，分组的插入顺序即位置顺序）
         position_groups = {}
-        for note in sorted(notes, key=lambda n: n.position_beats):
+        for note in notes:
             pos = note.position_beats
             if pos not in position_groups:
                 position_groups[pos] = []
             position_groups[pos].append(note)
         
         # 处理每个位置的音符
-        for pos, pos_notes in sorted(position_groups.items()):
+        for pos, pos_notes in position_groups.items():
             relative_pos = pos - measure_start
             
             # 处理音符间的间隔，添加最小间隔阈值检查
             gap = relative_pos - last_end_position
-            if gap > self.MIN_GAP_THRESHOLD:  # 只有当间隔大于阈值时才添加休止符
+            if gap > min_gap:  # 只有当间隔大于阈值时才添加休止符
                 rests = DurationManager.create_rest_with_duration(gap)
                 current_pos = last_end_position
                 for rest in rests:
-                    temp_stream.insert(current_pos, rest)
+                    add_pending((current_pos, rest))
                     current_pos += rest.duration.quarterLength
             
             # 处理音符或和弦
             if len(pos_notes) > 1:
                 chord = self._create_chord_with_ties(pos_notes, staff_type)
                 if chord:
-                    temp_stream.insert(relative_pos, chord)
+                    add_pending((relative_pos, chord))
                     last_end_position = relative_pos + chord.duration.quarterLength
+                    if chord.duration.type in ('eighth', '16th'):
+                        beam_candidates.append(chord)
             else:
                 note = pos_notes[0]
                 m21_note = self._create_note_with_ties(note, staff_type)
-                temp_stream.insert(relative_pos, m21_note)
+                add_pending((relative_pos, m21_note))
                 last_end_position = relative_pos + m21_note.duration.quarterLength
+                if (not isinstance(m21_note, music21.note.Rest)
+                        and m21_note.duration.type in ('eighth', '16th')):
+                    beam_candidates.append(m21_note)
         
         # 处理小节末尾的剩余空间
-        beats_per_measure = float(self.score_data.time_signature.split('/')[0])
         remaining_duration = beats_per_measure - last_end_position
-        if remaining_duration > self.MIN_GAP_THRESHOLD:  # 同样对末尾的间隔应用阈值检查
+        if remaining_duration > min_gap:  # 同样对末尾的间隔应用阈值检查
             rests = DurationManager.create_rest_with_duration(remaining_duration)
             current_pos = last_end_position
             for rest in rests:
-                temp_stream.insert(current_pos, rest)
+                add_pending((current_pos, rest))
                 current_pos += rest.duration.quarterLength
         
-        # 将临时Stream中的内容添加到实际小节中
-        for element in temp_stream:
-            measure.insert(element.offset, element)
+        # 按偏移稳定排序后批量插入，只在最后通知一次元素变更
+        # （逐个insert每次都会触发coreElementsChanged）
+        pending.sort(key=itemgetter(0))
+        for offset, element in pending:
+            measure.coreInsert(offset, element, ignoreSort=True)
+        measure.coreElementsChanged()
             
-        # 找出所有八分音符和16分音符
-        beam_notes = []
-        for note in measure.notes:
-            if isinstance(note, (music21.note.Note, music21.chord.Chord)):
-                if note.duration.type in ['eighth', '16th']:
-                    beam_notes.append(note)
-        
-        # 按照位置排序
-        beam_notes.sort(key=lambda n: n.positionBeats if hasattr(n, 'positionBeats') else n.offset)
+        # 提取分组判断所需的列数据，后续分析只按下标访问
+        # （候选音符已按位置顺序收集，无需再遍历小节和排序）
+        beam_array = NoteArray.from_elements(beam_candidates)
         
         # 找出需要连接的音符组
         beam_groups = []
         current_group = []
         
-        for i in range(len(beam_notes)):
-            curr_note = beam_notes[i]
-            
+        melodic = None
+        
+        for i in range(len(beam_array)):
             if not current_group:
-                current_group.append(curr_note)
+                current_group.append(i)
+                melodic = MelodicState.start(beam_array, i)
             else:
                 # 使用新的分组逻辑
-                if self._should_start_new_group(current_group, curr_note):
+                if self._should_start_new_group(beam_array, current_group, i, melodic):
                     if len(current_group) >= 2:
-                        beam_groups.append(current_group)
-                    current_group = [curr_note]
+                        beam_groups.append((current_group, melodic))
+                    current_group = [i]
+                    melodic = MelodicState.start(beam_array, i)
                 else:
-                    current_group.append(curr_note)
+                    current_group.append(i)
+                    melodic.append(i)
         
         # 处理最后一组
         if len(current_group) >= 2:
-            beam_groups.append(current_group)
+            beam_groups.append((current_group, melodic))
         
-        # 为每组音符设置beam
-        for group in beam_groups:
+        # 分组确定后再为每组音符设置beam
+        for group, group_melodic in beam_groups:
             # 获取组的类型
-            group_type = self._analyze_beam_group(group)
-            
-            # 确定是否包含16分音符
-            has_16th = any(n.duration.type == '16th' for n in group)
+            group_type = self._analyze_beam_group(beam_array, group, group_melodic)
             
-            for i, note in enumerate(group):
+            for i, index in enumerate(group):
+                note = beam_array.elements[index]
                 beam_type = 'start' if i == 0 else 'stop' if i == len(group) - 1 else 'continue'
                 
-                if note.duration.type == '16th':
+                if beam_array.duration_type[index] == '16th':
                     # 16分音符需要两层beam
                     note.beams.fill("eighth", type=beam_type)  # 第一层
                     note.beams.fill(2, type=beam_type)        # 第二层
@@ -413,21 +479,20 @@ class ScoreConverter:
                     note.beams.fill("eighth", type=beam_type)
                 
                 # 为调试目的保存组的类型
-                if hasattr(note, 'editorial'):
-                    note.editorial.comment = group_type
-        
-        # 让music21处理其他beam情况
-        measure.makeBeams()
+                note.editorial.comment = group_type
     
     def _create_note_with_ties(self, note: Note, staff_type: ClefType) -> music21.note.Note:
         """创建带有连音线的音符"""
         if note.pitch_name.lower() == 'rest':
             return music21.note.Rest()
         
-        m21_note = music21.note.Note(note.pitch_name)
-        m21_note.duration = DurationManager.create_duration(
-            duration_type=note.duration_type,
-            quarter_length=note.duration_beats * BEATS_PER_MEASURE
+        # 构造时直接传入时值，避免先创建再替换默认的Duration
+        m21_note = music21.note.Note(
+            note.pitch_name,
+            duration=DurationManager.create_duration(
+                duration_type=note.duration_type,
+                quarter_length=note.duration_beats * BEATS_PER_MEASURE
+            )
         )
         
         # 保存原始的positionBeats信息
@@ -435,10 +500,7 @@ class ScoreConverter:
         
         # 处理升降号
         if note.accidental:
-            m21_note.pitch.accidental = music21.pitch.Accidental(note.accidental)
-            if note.accidental_cautionary:
-                m21_note.pitch.accidental.cautionary = True
-                m21_note.pitch.accidental.displayType = "cautionary"
+            m21_note.pitch.accidental = _get_accidental(note.accidental, bool(note.accidental_cautionary))
         
         # 处理连音线
         if note.tie_type and note.pitch_midi_note is not None:
@@ -461,73 +523,30 @@ class ScoreConverter:
     
     def _create_chord_with_ties(self, notes: List[Note], staff_type: ClefType) -> Optional[music21.chord.Chord]:
         """创建带有连音线的和弦"""
-        pitches = []
-        note_objects = []
-        
-        for note in notes:
-            if note.pitch_name.lower() != 'rest':
-                m21_note = self._create_note_with_ties(note, staff_type)
-                pitches.append(note.pitch_name)
-                note_objects.append(m21_note)
-        
-        if not pitches:
+        # 和弦直接使用这些音符对象，连音线和升降号随之保留
+        note_objects = [
+            self._create_note_with_ties(note, staff_type)
+            for note in notes
+            if note.pitch_name.lower() != 'rest'
+        ]
+        
+        if not note_objects:
             return None
         
-        chord = music21.chord.Chord(pitches)
         # 使用第一个音的时值
-        chord.duration = DurationManager.create_duration(
-            duration_type=notes[0].duration_type,
-            quarter_length=notes[0].duration_beats * BEATS_PER_MEASURE
+        chord = music21.chord.Chord(
+            note_objects,
+            duration=DurationManager.create_duration(
+                duration_type=notes[0].duration_type,
+                quarter_length=notes[0].duration_beats * BEATS_PER_MEASURE
+            )
         )
         
         # 保存原始的positionBeats信息
         chord.positionBeats = notes[0].position_beats
         
-        # 将连音线和升降号信息从单个音转移到和弦的音符
-        for i, m21_note in enumerate(note_objects):
-            if hasattr(m21_note, 'tie') and m21_note.tie:
-                chord.notes[i].tie = m21_note.tie
-            if hasattr(m21_note.pitch, 'accidental') and m21_note.pitch.accidental:
-                chord.notes[i].pitch.accidental = m21_note.pitch.accidental
-        
         return chord
     
-    def _process_chord_notes(self, notes: List[Note], measure_start: float) -> List[music21.chord.Chord]:
-        """处理同一位置的多个音符（和弦）"""
-        # 按位置分组音符
-        position_groups = {}
-        for note in notes:
-            pos = note.position_beats
-            if pos not in position_groups:
-                position_groups[pos] = []
-            position_groups[pos].append(note)
-        
-        chords = []
-        for pos, chord_notes in position_groups.items():
-            if len(chord_notes) > 1:
-                # 创建和弦
-                pitches = [note.pitch_name for note in chord_notes]
-                chord = music21.chord.Chord(pitches)
-                # 使用第一个音符的时值
-                chord.duration = DurationManager.create_duration(
-                    duration_type=chord_notes[0].duration_type,
-                    quarter_length=chord_notes[0].duration_beats * BEATS_PER_MEASURE
-                )
-                chord.offset = pos - measure_start
-                chords.append(chord)
-            else:
-                # 单个音符
-                note = chord_notes[0]
-                m21_note = music21.note.Note(note.pitch_name)
-                m21_note.duration = DurationManager.create_duration(
-                    duration_type=note.duration_type,
-                    quarter_length=note.duration_beats * BEATS_PER_MEASURE
-                )
-                m21_note.offset = pos - measure_start
-                chords.append(m21_note)
-        
-        return chords
-    
     @classmethod
     def from_json(cls, json_path: str) -> 'ScoreConverter':
         """从JSON文件创建ScoreConverter对象"""
@@ -1,6 +1,8 @@
 # src/debug.py
 import logging
 from dataclasses import dataclass
+from math import fsum
+from operator import attrgetter
 from typing import List, Union, Dict, Optional
 import music21
 from src.constants import (
@@ -10,6 +12,8 @@ from src.constants import (
 
 logger = logging.getLogger(__name__)
 
+_get_quarter_length = attrgetter('duration.quarterLength')
+
 @dataclass
 class StaffDebugInfo:
     """谱表调试信息"""
@@ -23,7 +27,7 @@ class StaffDebugInfo:
             logger.debug(f"{indent}原始音符: 整小节休止符")
         else:
             logger.debug(f"{indent}原始音符:")
-            for note in sorted(self.notes, key=lambda n: n.position_beats):
+            for note in sorted(self.notes, key=attrgetter('position_beats')):
                 logger.debug(
                     f"{indent * 2}{note.pitch_name} @ "
                     f"位置{note.position_beats}拍, "
@@ -63,6 +67,9 @@ class ScoreDebugger:
         :param measure_numbers: 需要调试的小节号列表
         """
         self.measure_numbers = measure_numbers or []
+        # compare_measure 记录已处理的小节及其转换结果
+        self._processed_measures = set()
+        self.measure_info = {}
     
     def should_debug(self, measure_number: int) -> bool:
         """判断是否需要调试该小节"""
@@ -70,10 +77,7 @@ class ScoreDebugger:
     
     def validate_measure(self, measure_info: StaffDebugInfo) -> bool:
         """验证小节的时值总和是否正确"""
-        total_length = sum(
-            elem.duration.quarterLength 
-            for elem in measure_info.processed_elements
-        )
+        total_length = fsum(map(_get_quarter_length, measure_info.processed_elements))
         return abs(total_length - BEATS_PER_MEASURE) < 0.001
     
     def compare_measure(self, measure_number: int, measure_data, treble_measure, bass_measure):
@@ -92,31 +96,34 @@ class ScoreDebugger:
             'original': measure_data
         }
             
-        print(f"\n=== Debugging Measure {measure_number} ===")
-        print("Original Measure Data:")
-        print(f"Start Position: {measure_data.start_position_beats}")
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+            
+        logger.debug("=== Debugging Measure %s ===", measure_number)
+        logger.debug("Original Measure Data:")
+        logger.debug("Start Position: %s", measure_data.start_position_beats)
         
         # 打印原始JSON中的音符信息
         if hasattr(measure_data, 'notes'):
-            print("\nOriginal Notes:")
+            logger.debug("Original Notes:")
             for note in measure_data.notes:
-                print(f"Note: {note.pitch_name} @ position {note.position_beats}, "
-                      f"duration {note.duration_beats} beats")
+                logger.debug("Note: %s @ position %s, duration %s beats",
+                             note.pitch_name, note.position_beats, note.duration_beats)
         
-        print("\nConverted Result:")
-        print("Treble Staff:")
+        logger.debug("Converted Result:")
+        logger.debug("Treble Staff:")
         self._print_staff_elements(treble_measure.elements)
                 
-        print("\nBass Staff:")
+        logger.debug("Bass Staff:")
         self._print_staff_elements(bass_measure.elements)
     
     def _print_staff_elements(self, elements):
         """Helper method to print staff elements"""
         for element in elements:
             if isinstance(element, music21.note.Note):
-                print(f"Note: {element.nameWithOctave}, Duration: {element.duration.quarterLength}")
+                logger.debug("Note: %s, Duration: %s", element.nameWithOctave, element.duration.quarterLength)
             elif isinstance(element, music21.note.Rest):
-                print(f"Rest: Duration: {element.duration.quarterLength}")
+                logger.debug("Rest: Duration: %s", element.duration.quarterLength)
             elif isinstance(element, music21.chord.Chord):
                 notes = [n.nameWithOctave for n in element.notes]
-                print(f"Chord: {notes}, Duration: {element.duration.quarterLength}")
\ No newline at end of file
+                logger.debug("Chord: %s, Duration: %s", notes, element.duration.quarterLength)
\ No newline at end of file
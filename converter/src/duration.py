@@ -1,12 +1,17 @@
+import copy
 import logging
+import weakref
+from bisect import bisect_left
 from dataclasses import dataclass
-from typing import List, Optional, Set, Tuple, Union
+from operator import attrgetter
+from typing import Dict, List, Optional, Set, Tuple, Union
 import music21
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DurationInfo:
+    """标准时值信息（DurationManager 中的实例会被缓存共享，不可修改）"""
     type_name: str
     quarter_length: float
     is_dotted: bool = False
@@ -28,6 +33,16 @@ class DurationManager:
     # 增加容差值
     TOLERANCE = 0.05
     
+    # create_duration 的结果缓存，键为 (duration_type, quarter_length, dots)
+    _duration_cache: Dict[tuple, music21.duration.Duration] = {}
+    # find_closest_duration 的结果缓存，键为 quarter_length
+    _closest_cache: Dict[float, DurationInfo] = {}
+    # _get_tempo 的结果缓存，键为元素所在的小节（弱引用，小节释放后自动移除）；
+    # 值为 None 表示小节内有速度标记，需要逐个元素查找
+    _tempo_cache: 'weakref.WeakKeyDictionary[music21.stream.Measure, Optional[float]]' = weakref.WeakKeyDictionary()
+    # create_rest_with_duration 的时值分解缓存，键为 quarter_length
+    _rest_components_cache: Dict[float, Tuple[DurationInfo, ...]] = {}
+    
     # 基本时值定义
     BASE_DURATIONS = [
         DurationInfo(type_name='whole', quarter_length=4.0),
@@ -46,6 +61,41 @@ class DurationManager:
         for d in BASE_DURATIONS
     ]
     
+    # 全部时值（基本+附点），只构建一次，供各查找方法复用
+    ALL_DURATIONS = tuple(BASE_DURATIONS + DOTTED_DURATIONS)
+    
+    # find_closest_duration 使用的按时值从小到大排序的查找表；
+    # _SORTED_RANK 为在 ALL_DURATIONS 中的位置，距离相同时取靠前者（与 min() 一致）
+    _SORTED = sorted(enumerate(ALL_DURATIONS), key=lambda item: item[1].quarter_length)
+    _SORTED_QL = tuple(info.quarter_length for _, info in _SORTED)
+    _SORTED_INFO = tuple(info for _, info in _SORTED)
+    _SORTED_RANK = tuple(rank for rank, _ in _SORTED)
+    del _SORTED
+    
+    # decompose_duration 使用的按时值从大到小排序的时值表
+    BASE_DURATIONS_DESC = tuple(sorted(BASE_DURATIONS, key=attrgetter('quarter_length'), reverse=True))
+    DOTTED_DURATIONS_DESC = tuple(sorted(DOTTED_DURATIONS, key=attrgetter('quarter_length'), reverse=True))
+    # (时值类型, 附点数) -> DurationInfo，get_duration_info 新建的时值也会补充进来
+    _INFO_BY_KEY = {(d.type_name, d.dots): d for d in ALL_DURATIONS}
+    # 以64分音符为单位的时值 -> 基本时值，用于按二进制位分解整格时值
+    BASE_DURATIONS_BY_UNITS = {int(d.quarter_length * 16): d for d in BASE_DURATIONS}
+    WHOLE_UNITS = 64
+    # 基本时值类型名 -> DurationInfo
+    BASE_DURATIONS_BY_TYPE = {d.type_name: d for d in BASE_DURATIONS}
+    # (时值, 附点数) -> DurationInfo，from_music21_duration 精确匹配用
+    _INFO_BY_QL_DOTS = {(d.quarter_length, d.dots): d for d in ALL_DURATIONS}
+    # from_music21_duration 的连音时值缓存，相同连音总是返回同一实例
+    _TUPLET_INFO_CACHE: Dict[tuple, DurationInfo] = {}
+    
+    # 六连音（1/6拍）
+    SEXTUPLET_DURATION = DurationInfo(
+        type_name='quarter',  # 基础类型是四分音符
+        quarter_length=0.167,  # 精确的六连音时值
+        is_tuplet=True,
+        tuplet_ratio=(6, 4),  # 6个音符在4个音符的时值内
+        tuplet_type='quarter'  # 基础音符类型
+    )
+    
     @classmethod
     def set_debug_info(cls, debug_measures: List[int], current_measure: int, debug_enabled: bool = False) -> None:
         """设置调试信息"""
@@ -53,46 +103,72 @@ class DurationManager:
         cls.current_measure = current_measure
         cls.debug_enabled = debug_enabled
     
+    @classmethod
+    def set_current_measure(cls, current_measure: int) -> None:
+        """只更新当前小节号，调试小节列表保持不变"""
+        cls.current_measure = current_measure
+    
     @classmethod
     def should_log(cls) -> bool:
         """判断是否应该输出日志"""
         return (cls.debug_enabled and  # 首先检查是否启用调试
-                (not cls.debug_measures or cls.current_measure in cls.debug_measures))
+                (not cls.debug_measures or cls.current_measure in cls.debug_measures) and
+                logger.isEnabledFor(logging.DEBUG))
     
     @classmethod
     def find_closest_duration(cls, quarter_length: float) -> DurationInfo:
-        """查找最接近的时值，优先考虑标准时值"""
+        """查找最接近的时值，优先考虑标准时值
+        
+        结果只取决于 quarter_length，按值缓存；返回的 DurationInfo 为共享实例，不应修改。
+        """
+        # 调试模式下直接查找，保留每次查找的日志
+        if cls.should_log():
+            return cls._find_closest_duration(quarter_length)
+        
+        closest = cls._closest_cache.get(quarter_length)
+        if closest is None:
+            closest = cls._find_closest_duration(quarter_length)
+            cls._closest_cache[quarter_length] = closest
+        return closest
+    
+    @classmethod
+    def _find_closest_duration(cls, quarter_length: float) -> DurationInfo:
+        """实际查找最接近的时值"""
         # 特殊处理六连音的情况
         if 0.15 <= quarter_length <= 0.18:  # 1/6拍，六连音
-            return DurationInfo(
-                type_name='quarter',  # 基础类型是四分音符
-                quarter_length=0.167,  # 精确的六连音时值
-                is_tuplet=True,
-                tuplet_ratio=(6, 4),  # 6个音符在4个音符的时值内
-                tuplet_type='quarter'  # 基础音符类型
-            )
+            return cls.SEXTUPLET_DURATION
 
         # 首先检查是否接近标准时值
         for duration in cls.BASE_DURATIONS:
             if abs(duration.quarter_length - quarter_length) <= cls.TOLERANCE:
                 if cls.should_log():
                     logger.debug(
-                        f"查找时值 - 目标: {quarter_length}, "
-                        f"匹配标准时值: {duration.type_name} "
-                        f"(时值: {duration.quarter_length})"
+                        "查找时值 - 目标: %s, 匹配标准时值: %s (时值: %s)",
+                        quarter_length, duration.type_name, duration.quarter_length
                     )
                 return duration
 
         # 如果没有匹配的标准时值，再查找包括附点时值在内的最接近值
-        all_durations = cls.BASE_DURATIONS + cls.DOTTED_DURATIONS
-        closest = min(all_durations,
-                     key=lambda d: abs(d.quarter_length - quarter_length))
+        # 在有序表中二分查找，只需比较两侧相邻的时值
+        sorted_ql = cls._SORTED_QL
+        i = bisect_left(sorted_ql, quarter_length)
+        if i == 0:
+            closest = cls._SORTED_INFO[0]
+        elif i == len(sorted_ql):
+            closest = cls._SORTED_INFO[-1]
+        else:
+            lower_distance = abs(sorted_ql[i - 1] - quarter_length)
+            upper_distance = abs(sorted_ql[i] - quarter_length)
+            if lower_distance == upper_distance:
+                lower_wins = cls._SORTED_RANK[i - 1] < cls._SORTED_RANK[i]
+            else:
+                lower_wins = lower_distance < upper_distance
+            closest = cls._SORTED_INFO[i - 1] if lower_wins else cls._SORTED_INFO[i]
 
         if cls.should_log():
             logger.debug(
-                f"查找时值 - 目标: {quarter_length}, "
-                f"最接近的时值: {closest.type_name} "
-                f"(时值: {closest.quarter_length}, 附点: {closest.is_dotted})"
+                "查找时值 - 目标: %s, 最接近的时值: %s (时值: %s, 附点: %s)",
+                quarter_length, closest.type_name, closest.quarter_length, closest.is_dotted
             )
 
         return closest
@@ -104,7 +180,30 @@ class DurationManager:
         quarter_length: Optional[float] = None,
         dots: int = 0
     ) -> music21.duration.Duration:
-        """创建music21 Duration对象"""
+        """创建music21 Duration对象
+        
+        乐谱中不同的时值只有少数几种，首次创建后缓存原型，之后返回其副本。
+        Duration 对象是可变的，不能直接共享缓存中的实例。
+        """
+        # 调试模式下直接创建，保留每次创建的日志
+        if cls.should_log():
+            return cls._build_duration(duration_type, quarter_length, dots)
+        
+        key = (duration_type, quarter_length, dots)
+        prototype = cls._duration_cache.get(key)
+        if prototype is None:
+            prototype = cls._build_duration(duration_type, quarter_length, dots)
+            cls._duration_cache[key] = prototype
+        return copy.deepcopy(prototype)
+    
+    @classmethod
+    def _build_duration(
+        cls,
+        duration_type: Optional[str],
+        quarter_length: Optional[float],
+        dots: int
+    ) -> music21.duration.Duration:
+        """实际创建music21 Duration对象"""
         duration = music21.duration.Duration()
         
         # 检查是否是六连音 (1/6拍)，将其转换为三连音
@@ -120,9 +219,8 @@ class DurationManager:
             
             if cls.should_log():
                 logger.debug(
-                    f"创建三连音（由六连音转换） - 类型: quarter, "
-                    f"时值: {duration.quarterLength}, "
-                    f"tuplet: 3:2"
+                    "创建三连音（由六连音转换） - 类型: quarter, 时值: %s, tuplet: 3:2",
+                    duration.quarterLength
                 )
             return duration
             
@@ -149,20 +247,22 @@ class DurationManager:
     @classmethod
     def get_duration_info(cls, duration_type: str, dots: int = 0) -> DurationInfo:
         """获取指定时值类型的 DurationInfo"""
-        all_durations = cls.BASE_DURATIONS + cls.DOTTED_DURATIONS
-        for duration in all_durations:
-            if duration.type_name == duration_type and duration.dots == dots:
-                return duration
+        key = (duration_type, dots)
+        info = cls._INFO_BY_KEY.get(key)
+        if info is not None:
+            return info
         
-        # 如果找不到匹配的预定义时值，创建一个新的
+        # 如果找不到匹配的预定义时值，创建一个新的（每种组合只创建一次）
         duration = music21.duration.Duration(type=duration_type)
         duration.dots = dots
-        return DurationInfo(
+        info = DurationInfo(
             type_name=duration_type,
             quarter_length=duration.quarterLength,
             is_dotted=dots > 0,
             dots=dots
         )
+        cls._INFO_BY_KEY[key] = info
+        return info
     
     @classmethod
     def from_music21_duration(cls, duration: music21.duration.Duration) -> DurationInfo:
@@ -173,28 +273,34 @@ class DurationManager:
         # 检查是否是六连音
         if duration.tuplets and len(duration.tuplets) > 0:
             tuplet = duration.tuplets[0]
-            return DurationInfo(
-                type_name=duration.type,
-                quarter_length=quarter_length,
-                is_tuplet=True,
-                tuplet_ratio=(tuplet.numberNotesActual, tuplet.numberNotesNormal),
-                tuplet_type=tuplet.durationNormal.type
+            key = (
+                duration.type, quarter_length,
+                tuplet.numberNotesActual, tuplet.numberNotesNormal, tuplet.durationNormal.type
             )
+            info = cls._TUPLET_INFO_CACHE.get(key)
+            if info is None:
+                info = DurationInfo(
+                    type_name=key[0],
+                    quarter_length=quarter_length,
+                    is_tuplet=True,
+                    tuplet_ratio=(key[2], key[3]),
+                    tuplet_type=key[4]
+                )
+                cls._TUPLET_INFO_CACHE[key] = info
+            return info
         
         # 首先尝试精确匹配
-        all_durations = cls.BASE_DURATIONS + cls.DOTTED_DURATIONS
-        for dur_info in all_durations:
-            if (dur_info.quarter_length == quarter_length and 
-                dur_info.dots == dots):
-                return dur_info
+        dur_info = cls._INFO_BY_QL_DOTS.get((quarter_length, dots))
+        if dur_info is not None:
+            return dur_info
         
         # 如果没有精确匹配，查找最接近的标准时值
         closest = cls.find_closest_duration(quarter_length)
         
         if cls.should_log():
             logger.debug(
-                f"从music21提取时值 - 原始: {duration.type}({duration.quarterLength}), "
-                f"转换后: {closest.type_name}({closest.quarter_length})"
+                "从music21提取时值 - 原始: %s(%s), 转换后: %s(%s)",
+                duration.type, duration.quarterLength, closest.type_name, closest.quarter_length
             )
         
         return closest
@@ -216,12 +322,14 @@ class DurationManager:
         dur_info = cls.from_music21_duration(duration)
         
         # 计算精确的时间长度
-        beats = duration.quarterLength / 4.0  # 将四分音符长度转换为以全音符为单位
-        seconds = duration.quarterLength * 60 / cls._get_tempo(element)  # 使用原始的quarterLength计算秒数
+        quarter_length = duration.quarterLength
+        beats = quarter_length / 4.0  # 将四分音符长度转换为以全音符为单位
+        seconds = quarter_length * 60 / cls._get_tempo(element)  # 使用原始的quarterLength计算秒数
         
-        # 检查是否为连音符组的一部分
-        if hasattr(duration, 'tuplets') and duration.tuplets:
-            tuplet = duration.tuplets[0]  # 获取第一个连音符信息
+        # 检查是否为连音符组的一部分（Duration.tuplets 总是存在，没有连音时为空元组）
+        tuplets = duration.tuplets
+        if tuplets:
+            tuplet = tuplets[0]  # 获取第一个连音符信息
             actual = tuplet.numberNotesActual
             normal = tuplet.numberNotesNormal
             # 调整连音符的持续时间
@@ -230,20 +338,46 @@ class DurationManager:
         
         if cls.should_log():
             logger.debug(
-                f"提取时值信息 - 类型: {dur_info.type_name}, "
-                f"拍数: {beats}, 秒数: {seconds:.3f}"
+                "提取时值信息 - 类型: %s, 拍数: %s, 秒数: %.3f",
+                dur_info.type_name, beats, seconds
             )
         
         return dur_info, beats, seconds
     
     @classmethod
     def _get_tempo(cls, element: music21.base.Music21Object) -> float:
-        """获取音符所在位置的速度"""
+        """获取音符所在位置的速度
+        
+        上下文查找需要遍历整个乐谱层级，代价很高。所在小节（包括其中的声部）
+        没有任何速度标记时，小节内所有元素的速度都相同，按小节缓存查找结果。
+        速度标记可能直接放在小节中而音符位于声部（Voice）内，所以缓存键必须是
+        小节而不是元素的直接容器。
+        """
+        measure = cls._enclosing_measure(element)
+        known = False
+        if measure is not None:
+            known = measure in cls._tempo_cache
+            cached = cls._tempo_cache.get(measure)
+            if cached is not None:
+                return cached
+        
         # 查找最近的速度标记
         tempo = element.getContextByClass(music21.tempo.MetronomeMark)
-        if tempo:
-            return tempo.number
-        return 120.0  # 默认速度
+        number = tempo.number if tempo else 120.0  # 默认速度
+        
+        # 每个小节只检查一次其中是否有速度标记，有标记时记为 None
+        if measure is not None and not known:
+            has_tempo_mark = measure.recurse().getElementsByClass(music21.tempo.MetronomeMark).first() is not None
+            cls._tempo_cache[measure] = None if has_tempo_mark else number
+        return number
+    
+    @staticmethod
+    def _enclosing_measure(element: music21.base.Music21Object) -> Optional[music21.stream.Measure]:
+        """沿 activeSite 向上查找元素所在的小节，找不到时返回 None"""
+        site = element.activeSite
+        while site is not None and not isinstance(site, music21.stream.Measure):
+            site = site.activeSite
+        return site
     
     @classmethod
     def validate_duration(
@@ -295,15 +429,16 @@ class DurationManager:
             2.5 -> [二分音符(2.0), 八分音符(0.5)]
             3.5 -> [二分音符(2.0), 四分音符(1.0), 八分音符(0.5)]
         """
+        # 时值恰好是64分音符的整数倍时，贪心分解等价于按二进制位拆分
+        units = quarter_length * 16
+        if units > 0 and units == int(units) and not cls.should_log():
+            return cls._decompose_units(int(units))
+        
         result = []
         remaining = quarter_length
         
         # 优先使用基本时值，按照时值从大到小排序
-        base_durations = sorted(
-            cls.BASE_DURATIONS,
-            key=lambda x: x.quarter_length,
-            reverse=True
-        )
+        base_durations = cls.BASE_DURATIONS_DESC
         
         # 如果剩余时值完全匹配某个基本时值，直接返回
         for duration in base_durations:
@@ -311,18 +446,12 @@ class DurationManager:
                 return [duration]
         
         # 如果没有完全匹配的基本时值，检查是否匹配带附点的时值
-        dotted_durations = sorted(
-            cls.DOTTED_DURATIONS,
-            key=lambda x: x.quarter_length,
-            reverse=True
-        )
-        
-        for duration in dotted_durations:
+        for duration in cls.DOTTED_DURATIONS_DESC:
             if abs(duration.quarter_length - quarter_length) < 0.001:
                 # 对于带附点的时值，将其分解为基本时值
                 # 例如：附点四分音符(1.5) -> 四分音符(1.0) + 八分音符(0.5)
                 base_type = duration.type_name
-                base_duration = next(d for d in base_durations if d.type_name == base_type)
+                base_duration = cls.BASE_DURATIONS_BY_TYPE[base_type]
                 remaining_duration = duration.quarter_length - base_duration.quarter_length
                 
                 result.append(base_duration)
@@ -344,18 +473,33 @@ class DurationManager:
             
             if not found:
                 # 如果找不到合适的时值，使用最小的时值（通常是32分音符）
-                smallest = min(base_durations, key=lambda x: x.quarter_length)
+                smallest = base_durations[-1]
                 result.append(smallest)
                 remaining -= smallest.quarter_length
         
         if cls.should_log():
             logger.debug(
-                f"分解时值 {quarter_length} -> " +
+                "分解时值 %s -> %s", quarter_length,
                 ", ".join([f"{d.type_name}({d.quarter_length})" for d in result])
             )
         
         return result
     
+    @classmethod
+    def _decompose_units(cls, units: int) -> List[DurationInfo]:
+        """按二进制位分解以64分音符为单位的时值（从大到小）"""
+        result = []
+        by_units = cls.BASE_DURATIONS_BY_UNITS
+        whole_units = cls.WHOLE_UNITS
+        while units >= whole_units:
+            result.append(by_units[whole_units])
+            units -= whole_units
+        while units:
+            top = 1 << (units.bit_length() - 1)
+            result.append(by_units[top])
+            units -= top
+        return result
+    
     @classmethod
     def create_rest_with_duration(cls, quarter_length: float) -> List[music21.note.Rest]:
         """创建一组标准时值的休止符
@@ -366,18 +510,33 @@ class DurationManager:
         Returns:
             List[music21.note.Rest]: 休止符列表
         """
-        durations = cls.decompose_duration(quarter_length)
-        rests = []
+        # 先确定时值分解（纯计算，可按时值缓存），再创建music21对象
+        if cls.should_log():
+            durations = cls.decompose_duration(quarter_length)
+        else:
+            durations = cls._rest_components_cache.get(quarter_length)
+            if durations is None:
+                durations = tuple(cls.decompose_duration(quarter_length))
+                cls._rest_components_cache[quarter_length] = durations
         
-        for dur_info in durations:
-            rest = music21.note.Rest()
-            rest.duration = cls.create_duration_from_info(dur_info)
-            rests.append(rest)
+        # 直接传入duration，避免Rest先创建一个默认Duration再被替换
+        rests = [
+            music21.note.Rest(duration=cls.create_duration_from_info(dur_info))
+            for dur_info in durations
+        ]
         
         if cls.should_log():
             logger.debug(
-                f"创建休止符组 {quarter_length} -> " +
+                "创建休止符组 %s -> %s", quarter_length,
                 ", ".join([f"{r.duration.type}({r.duration.quarterLength})" for r in rests])
             )
         
-        return rests
\ No newline at end of file
+        return rests
+
+
+# 乐谱中的时值高度重复，预先填入所有标准（含附点）时值的查找结果，
+# 常见情况下 find_closest_duration 只需一次字典查找
+DurationManager._closest_cache.update(
+    (info.quarter_length, DurationManager._find_closest_duration(info.quarter_length))
+    for info in DurationManager.ALL_DURATIONS
+)
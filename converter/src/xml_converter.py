@@ -1,4 +1,6 @@
+import logging
 import os
+from operator import attrgetter
 from typing import List, Dict, Optional, Tuple, Union
 import music21
 from music21.exceptions21 import Music21Exception
@@ -12,6 +14,11 @@ from src.duration import DurationManager, DurationInfo
 import json
 import random
 
+try:
+    import orjson  # 可选依赖，序列化大型JSON明显更快
+except ImportError:
+    orjson = None
+
 class XMLConverterError(Exception):
     """XML转换器基础异常类"""
     pass
@@ -42,6 +49,9 @@ class MusicXMLConverter:
     BEAT_SPACING = 57.95  # 每拍基准间距
     FIRST_MEASURE_X = 71.6765  # 第一小节的起始x坐标
     
+    # _calculate_y_position 的结果缓存，键为 (midi, clef_type)
+    _y_position_cache: Dict[Tuple[int, ClefType], float] = {}
+    
     def __init__(self, xml_path: str, debugger: Optional[ScoreDebugger] = None):
         """
         初始化XML转换器
@@ -74,6 +84,11 @@ class MusicXMLConverter:
             # 基本验证
             self._validate_score_structure()
             
+            # 速度标记在转换过程中不变，只需展开乐谱查找一次
+            self._tempo_mark = self.score.flatten().getElementsByClass(
+                music21.tempo.MetronomeMark
+            ).first()
+            
             # 初始化调试信息
             self._init_debug_info()
             
@@ -85,6 +100,10 @@ class MusicXMLConverter:
             error_msg = f"解析MusicXML文件时出错: {str(e)}"
             logger.error(error_msg)
             raise XMLFormatError(error_msg)
+        except ET.ParseError as e:
+            error_msg = f"XML文件格式错误: {str(e)}"
+            logger.error(error_msg)
+            raise XMLFormatError(error_msg)
         except Exception as e:
             error_msg = f"初始化转换器时出错: {str(e)}"
             logger.error(error_msg)
@@ -108,10 +127,10 @@ class MusicXMLConverter:
             error_msg = f"不支持的文件格式: {self.xml_path}"
             logger.warning(error_msg)
             
-        # 尝试解析XML结构
+        # 只读取到根元素为止检查格式，不构建整棵DOM；
+        # 文件其余部分的格式错误在随后music21解析时报告
         try:
-            tree = ET.parse(self.xml_path)
-            root = tree.getroot()
+            _, root = next(ET.iterparse(self.xml_path, events=('start',)))
             
             # 检查是否为MusicXML文件
             if 'score-partwise' not in root.tag:
@@ -148,6 +167,7 @@ class MusicXMLConverter:
                 )
             
             # 检查每个声部的内容
+            measure_counts = []
             for part_index, part in enumerate(parts):
                 part_name = f"部 {part_index + 1}"
                 
@@ -155,6 +175,7 @@ class MusicXMLConverter:
                 measures = part.getElementsByClass('Measure')
                 if not measures:
                     raise MusicStructureError(f"{part_name} 中没有找到小节")
+                measure_counts.append(len(measures))
                 
                 # 检查第一个小节中的基本属性
                 first_measure = measures[0]
@@ -174,13 +195,11 @@ class MusicXMLConverter:
                 if not clef:
                     logger.warning(f"{part_name} 未指定谱号，将使用默认谱号")
                 
-                # 检查是否包含音符或休止符
-                notes = part.flatten().notesAndRests
-                if not notes:
+                # 检查是否包含音符或休止符（找到第一个即停止，不必展平整个声部）
+                if part.recurse().notesAndRests.first() is None:
                     raise MusicStructureError(f"{part_name} 中没有找到音符或休止符")
             
             # 检查各声部的小节数是否一致
-            measure_counts = [len(part.getElementsByClass('Measure')) for part in parts]
             if len(set(measure_counts)) > 1:
                 raise MusicStructureError(
                     f"声部小数不一致: {', '.join(str(count) for count in measure_counts)}"
@@ -204,12 +223,13 @@ class MusicXMLConverter:
             try:
                 # 记录基本乐谱信息
                 parts = self.score.parts
+                first_part_measures = parts[0].getElementsByClass('Measure')
                 logger.debug("乐谱信息:")
                 logger.debug(f"  声数量: {len(parts)}")
-                logger.debug(f"  小节数量: {len(parts[0].getElementsByClass('Measure'))}")
+                logger.debug(f"  小节数量: {len(first_part_measures)}")
                 
                 # 第个声部的基本属性
-                first_measure = parts[0].getElementsByClass('Measure')[0]
+                first_measure = first_part_measures[0]
                 logger.debug("第一小节属性:")
                 if first_measure.timeSignature:
                     logger.debug(f"  拍号: {first_measure.timeSignature}")
@@ -247,6 +267,11 @@ class MusicXMLConverter:
             # 获取小节数量
             measure_count = len(treble_part.measures(1, None))
             
+            # 按小节号建立索引，避免每个小节都调用 part.measure(n) 重新扫描声部；
+            # 小节号重复时与 part.measure(n) 一样取第一个
+            treble_by_number = self._index_measures_by_number(treble_part)
+            bass_by_number = self._index_measures_by_number(bass_part)
+            
             # 遍历所有节
             measures = []
             for i in range(measure_count):
@@ -257,8 +282,8 @@ class MusicXMLConverter:
                     continue
                     
                 # 获取对应小节
-                treble_measure = treble_part.measure(measure_number)
-                bass_measure = bass_part.measure(measure_number)
+                treble_measure = treble_by_number.get(measure_number)
+                bass_measure = bass_by_number.get(measure_number)
                 
                 if not treble_measure or not bass_measure:
                     logger.warning(f"小节 {measure_number} 不完整，跳过")
@@ -273,6 +298,14 @@ class MusicXMLConverter:
             logger.error(error_msg)
             raise XMLConverterError(error_msg)
 
+    @staticmethod
+    def _index_measures_by_number(part: music21.stream.Part) -> Dict[int, music21.stream.Measure]:
+        """建立 小节号 -> 小节 的索引（同一小节号只保留第一个）"""
+        by_number = {}
+        for measure in part.getElementsByClass('Measure'):
+            by_number.setdefault(measure.number, measure)
+        return by_number
+
     def save_json(self, output_path: str) -> None:
         """保存为JSON文件
         
@@ -285,41 +318,17 @@ class MusicXMLConverter:
             
             # 转为JSON格式的字典
             json_data = {
-                'measures': [],
+                'measures': [self._measure_to_dict(measure) for measure in data['measures']],
                 'pageWidth': data['page_width']
             }
             
-            # 转换measures
-            for measure in data['measures']:
-                json_data['measures'].append({
-                    'number': measure.number,
-                    'height': measure.height,
-                    'notes': [{
-                        'durationBeats': note.duration_beats,
-                        'durationSeconds': note.duration_seconds,
-                        'durationType': note.duration_type,
-                        'height': note.height,
-                        'pitchMidiNote': note.pitch_midi_note,
-                        'pitchName': note.pitch_name,
-                        'positionBeats': note.position_beats,
-                        'positionSeconds': note.position_seconds,
-                        'tieType': note.tie_type,
-                        'width': note.width,
-                        'x': note.x,
-                        'y': note.y,
-                        'staff': note.staff
-                    } for note in measure.notes],
-                    'staffDistance': measure.staff_distance,
-                    'startPositionBeats': measure.start_position_beats,
-                    'startPositionSeconds': measure.start_position_seconds,
-                    'width': measure.width,
-                    'x': measure.x,
-                    'y': measure.y
-                })
-            
             # 写入JSON文件
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, indent=2)
+            if orjson is not None:
+                with open(output_path, 'wb') as f:
+                    f.write(orjson.dumps(json_data, option=orjson.OPT_INDENT_2))
+            else:
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    json.dump(json_data, f, indent=2)
                 
         except Exception as e:
             error_msg = f"保存JSON文件失败: {str(e)}"
@@ -372,7 +381,8 @@ class MusicXMLConverter:
                 measures.append(measure)
                 
                 # 只在处理debug_measures中的小节时输出调试信息
-                if self.debugger and measure_number in self.debug_measures:
+                if (self.debugger and measure_number in self.debug_measures
+                        and logger.isEnabledFor(logging.INFO)):
                     logger.info(f"\n=== 小节 {measure_number} ===")
                     for note in measure.notes:
                         logger.info(f"- {note.pitch_name} ({note.duration_type}音符): "
@@ -394,38 +404,6 @@ class MusicXMLConverter:
             logger.error(error_msg)
             raise XMLConverterError(error_msg)
         
-    def _convert_to_camel_case(self, data: dict) -> dict:
-        """将划线命名转换峰命名"""
-        field_mapping = {
-            'duration_beats': 'durationBeats',
-            'duration_seconds': 'durationSeconds',
-            'duration_type': 'durationType',
-            'pitch_midi_note': 'pitchMidiNote',
-            'pitch_name': 'pitchName',
-            'position_beats': 'positionBeats',
-            'position_seconds': 'positionSeconds',
-            'tie_type': 'tieType',
-            'start_position_beats': 'startPositionBeats',
-            'start_position_seconds': 'startPositionSeconds',
-            'staff_distance': 'staff_distance',
-            'page_width': 'pageWidth',
-            'number': 'number'
-        }
-        
-        if isinstance(data, list):
-            return [self._convert_to_camel_case(item if isinstance(item, dict) else item.__dict__)
-                    for item in data]
-        elif not isinstance(data, dict):
-            return data
-        
-        result = {}
-        for k, v in data.items():
-            if isinstance(v, (list, dict)):
-                v = self._convert_to_camel_case(v)
-            new_key = field_mapping.get(k, k)
-            result[new_key] = v
-        return result
-        
     def _calculate_y_position(self, pitch: music21.pitch.Pitch, clef_type: ClefType) -> float:
         """计算音符的Y坐标位置
         
@@ -436,6 +414,16 @@ class MusicXMLConverter:
         Returns:
             float: Y坐标位置
         """
+        # 坐标只取决于音高和谱号，乐谱中的音高高度重复，按 (midi, 谱号) 缓存
+        key = (pitch.midi, clef_type)
+        y = self._y_position_cache.get(key)
+        if y is None:
+            y = self._y_position_cache[key] = self._compute_y_position(key[0], clef_type)
+        return y
+    
+    @staticmethod
+    def _compute_y_position(midi: int, clef_type: ClefType) -> float:
+        """根据MIDI音高和谱号计算Y坐标"""
         # 定义基准音高和位置
         if clef_type == ClefType.TREBLE:
             # 使用E4作为基准音，因为它在高音谱表第一线
@@ -444,7 +432,7 @@ class MusicXMLConverter:
             semitone_spacing = 2.5  # 每个半音的间距
             
             # 计算与基准音高的半音差
-            semitones = pitch.midi - base_midi
+            semitones = midi - base_midi
             
             # 使用非线性映射来更准确地匹配ground truth值
             if semitones > 0:
@@ -460,7 +448,7 @@ class MusicXMLConverter:
             semitone_spacing = 2.5
             
             # 计算与基准音高的半音差
-            semitones = pitch.midi - base_midi
+            semitones = midi - base_midi
             y = base_y + (semitones * semitone_spacing)
         
         return y
@@ -485,23 +473,58 @@ class MusicXMLConverter:
         Returns:
             Note: 转换后的音符对象
         """
+        return self._build_note(
+            pitch=note.pitch,
+            tie=note.tie,
+            timing=self._extract_note_timing(note),
+            clef_type=clef_type,
+            current_position=current_position,
+            is_chord=is_chord,
+            chord_index=chord_index
+        )
+    
+    def _extract_note_timing(
+        self,
+        note: music21.note.Note
+    ) -> Tuple[DurationInfo, float, float, Optional[str]]:
+        """获取音符的时值信息
+        
+        Returns:
+            Tuple[DurationInfo, float, float, Optional[str]]: (时值信息, 拍数, 秒数, 连音比例)
+        """
         # 检查是否为连音符组的一部分
-        is_tuplet = False
+        # （Duration.tuplets 总是存在，没有连音时为空元组）
         tuplet_ratio = None
-        if hasattr(note, 'duration') and hasattr(note.duration, 'tuplets') and note.duration.tuplets:
-            is_tuplet = True
-            tuplet = note.duration.tuplets[0]  # 获取第一个连音符信息
-            tuplet_ratio = f"{tuplet.numberNotesActual}:{tuplet.numberNotesNormal}"
+        tuplets = note.duration.tuplets
+        if tuplets:
+            tuplet = tuplets[0]  # 获取第一个连音符信息
+            actual = tuplet.numberNotesActual
+            normal = tuplet.numberNotesNormal
+            tuplet_ratio = f"{actual}:{normal}"
         
         # 使用DurationManager获取时值信息
         dur_info, beats, seconds = DurationManager.extract_duration_info(note)
         
         # 如果是连音符，调整持续时间
-        if is_tuplet:
-            actual, normal = map(int, tuplet_ratio.split(':'))
+        if tuplet_ratio is not None:
             beats = beats * normal / actual
             seconds = seconds * normal / actual
         
+        return dur_info, beats, seconds, tuplet_ratio
+    
+    def _build_note(
+        self,
+        pitch: music21.pitch.Pitch,
+        tie: Optional[music21.tie.Tie],
+        timing: Tuple[DurationInfo, float, float, Optional[str]],
+        clef_type: ClefType,
+        current_position: float,
+        is_chord: bool = False,
+        chord_index: int = 0
+    ) -> Note:
+        """根据音高、连音线和时值信息创建音符对象"""
+        dur_info, beats, seconds, tuplet_ratio = timing
+        
         # 计算x坐标(考虑和弦位置)
         x = self._calculate_note_x_position(
             position_beats=current_position,
@@ -511,11 +534,11 @@ class MusicXMLConverter:
         )
         
         # 计算y坐标
-        y = self._calculate_y_position(note.pitch, clef_type)
+        y = self._calculate_y_position(pitch, clef_type)
         
         # 创建音符对象
         note_obj = Note(
-            pitch_name=note.nameWithOctave,
+            pitch_name=pitch.nameWithOctave,
             duration_beats=beats,
             duration_seconds=seconds,
             duration_type=dur_info.type_name,
@@ -526,13 +549,13 @@ class MusicXMLConverter:
             x=x,
             y=y,
             staff=clef_type.value,
-            pitch_midi_note=note.pitch.midi,
-            tie_type=note.tie.type if note.tie else None,
+            pitch_midi_note=pitch.midi,
+            tie_type=tie.type if tie else None,
             is_chord=is_chord
         )
         
         # 如果是连音符，添加连音符信息
-        if is_tuplet:
+        if tuplet_ratio is not None:
             note_obj.is_tuplet = True
             note_obj.tuplet_ratio = tuplet_ratio
         
@@ -545,17 +568,21 @@ class MusicXMLConverter:
         current_position: float
     ) -> List[Note]:
         """处理和弦"""
-        notes = []
-        for i, pitch in enumerate(chord.pitches):
-            note = music21.note.Note(pitch, duration=chord.duration)
-            notes.append(self._convert_note(
-                note=note,
+        # 和弦各音的时值相同，只用一个临时音符计算一次；与逐音创建临时音符时一样，
+        # 它不属于任何小节，也没有连音线
+        timing = self._extract_note_timing(music21.note.Note(duration=chord.duration))
+        return [
+            self._build_note(
+                pitch=pitch,
+                tie=None,
+                timing=timing,
                 clef_type=clef_type,
                 current_position=current_position,
                 is_chord=True,
                 chord_index=i
-            ))
-        return notes
+            )
+            for i, pitch in enumerate(chord.pitches)
+        ]
 
     def _convert_measure(
         self,
@@ -571,18 +598,23 @@ class MusicXMLConverter:
             # 用于跟踪每个位置的和弦音符
             chord_positions = {}
             
+            # 调试日志的格式化只在启用DEBUG级别时进行
+            debug = logger.isEnabledFor(logging.DEBUG)
+            
             # 记录开始处理新的小节
-            logger.debug(f"\nProcessing measure {measure_number}")
-            logger.debug(f"Start position: {start_position}")
+            if debug:
+                logger.debug(f"\nProcessing measure {measure_number}")
+                logger.debug(f"Start position: {start_position}")
             
             # 处理高音谱和低音谱
             for measure, clef_type in [(treble_measure, ClefType.TREBLE), 
                                      (bass_measure, ClefType.BASS)]:
                 try:
-                    logger.debug(f"\nProcessing {clef_type.name} staff")
-                    # 检查小节中的音符数量
-                    note_count = len(list(measure.notesAndRests))
-                    logger.debug(f"Found {note_count} notes/rests in {clef_type.name} staff")
+                    # 检查小节中的音符数量（需要额外遍历一次小节，只在调试时统计）
+                    if debug:
+                        logger.debug(f"\nProcessing {clef_type.name} staff")
+                        note_count = len(measure.notesAndRests)
+                        logger.debug(f"Found {note_count} notes/rests in {clef_type.name} staff")
                     
                     staff_notes = self._process_staff(
                         measure=measure,
@@ -591,7 +623,8 @@ class MusicXMLConverter:
                         chord_positions=chord_positions
                     )
                     
-                    logger.debug(f"Processed {len(staff_notes)} notes in {clef_type.name} staff")
+                    if debug:
+                        logger.debug(f"Processed {len(staff_notes)} notes in {clef_type.name} staff")
                     notes.extend(staff_notes)
                     
                 except Exception as e:
@@ -605,6 +638,9 @@ class MusicXMLConverter:
             # 更新小节位置信息
             self._update_measure_positions(measure_number, width)
             
+            # notes是本地列表，直接原地排序，调试输出和最终的小节对象共用
+            notes.sort(key=attrgetter('position_beats', 'y'))
+            
             # 输出调试信息
             if self.debugger:
                 self._debug_measure_info(measure_number, notes, width, x)
@@ -619,14 +655,15 @@ class MusicXMLConverter:
                 y=-150.0,
                 start_position_beats=start_position,
                 start_position_seconds=start_position * 60 / self._get_tempo(),
-                notes=sorted(notes, key=lambda n: (n.position_beats, n.y))
+                notes=notes
             )
             
             # 记录处理结果
-            logger.debug(f"Measure {measure_number} processed:")
-            logger.debug(f"- Width: {width}")
-            logger.debug(f"- X position: {x}")
-            logger.debug(f"- Total notes: {len(notes)}")
+            if debug:
+                logger.debug(f"Measure {measure_number} processed:")
+                logger.debug(f"- Width: {width}")
+                logger.debug(f"- X position: {x}")
+                logger.debug(f"- Total notes: {len(notes)}")
             
             return measure
             
@@ -720,13 +757,17 @@ class MusicXMLConverter:
         x: float
     ) -> None:
         """增强的调试信息输出"""
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        
         logger.info(f"\n=== 小节 {measure_number} ===")
         logger.info(f"小节起始位置: x={x:.2f}")
         logger.info(f"小节度: {width:.2f}")
         logger.info(f"音符数量: {len(notes)}")
         logger.info("音符列表:")
         
-        for note in sorted(notes, key=lambda n: (n.position_beats, n.y)):
+        # notes 已由 _convert_measure 按位置和y坐标排好序
+        for note in notes:
             relative_pos = note.position_beats - ((measure_number - 1) * BEATS_PER_MEASURE)
             logger.info(
                 f"- {note.pitch_name} ({note.duration_type}音符): "
@@ -737,14 +778,14 @@ class MusicXMLConverter:
 
     def _get_tempo(self) -> float:
         """获取速度"""
-        for element in self.score.flatten().getElementsByClass(music21.tempo.MetronomeMark):
-            return element.number
+        if self._tempo_mark is not None:
+            return self._tempo_mark.number
         return 120.0  # 默认速度
         
     def _get_tempo_text(self) -> str:
         """获取速度文字标记"""
-        for element in self.score.flatten().getElementsByClass(music21.tempo.MetronomeMark):
-            return element.text or ""
+        if self._tempo_mark is not None:
+            return self._tempo_mark.text or ""
         return ""
         
     def _get_metadata_field(self, field: str) -> str:
@@ -761,18 +802,20 @@ class MusicXMLConverter:
         chord_index: int = 0
     ) -> float:
         """计算音符的X坐标位置"""
+        beat_spacing = self.BEAT_SPACING
+        start_positions = self._measure_start_positions
+        
         # 获取小节起始位置
-        if measure_number not in self._measure_start_positions:
+        measure_x = start_positions.get(measure_number)
+        if measure_x is None:
             prev_measure = measure_number - 1
-            prev_x = self._measure_start_positions.get(prev_measure, self.FIRST_MEASURE_X)
-            prev_width = self._previous_measure_width or self.BEAT_SPACING * BEATS_PER_MEASURE
-            self._measure_start_positions[measure_number] = prev_x + prev_width
-        
-        measure_x = self._measure_start_positions[measure_number]
+            prev_x = start_positions.get(prev_measure, self.FIRST_MEASURE_X)
+            prev_width = self._previous_measure_width or beat_spacing * BEATS_PER_MEASURE
+            measure_x = start_positions[measure_number] = prev_x + prev_width
         
         # 计算小节内的相对位置
         relative_pos = position_beats - ((measure_number - 1) * BEATS_PER_MEASURE)
-        x = measure_x + self.BEAT_SPACING * relative_pos
+        x = measure_x + beat_spacing * relative_pos
         
         # 和弦音符的位置调整
         if is_chord:
@@ -864,14 +907,24 @@ class MusicXMLConverter:
         )
 
     @staticmethod
-    def extract_duration_info(note: Union[music21.note.Note, music21.chord.Chord, music21.note.Rest]) -> Tuple[DurationInfo, float, float]:
-        """提取音符的持续时间信息"""
+    def extract_duration_info(
+        note: Union[music21.note.Note, music21.chord.Chord, music21.note.Rest],
+        seconds_per_beat: float = 0.5
+    ) -> Tuple[DurationInfo, float, float]:
+        """提取音符的持续时间信息
+        
+        Args:
+            note: music21音乐元素
+            seconds_per_beat: 每拍秒数（60 / 速度），默认对应速度120；
+                批量处理时由调用方按乐谱速度算好一次后传入
+        """
         try:
-            dur_type = note.duration.type
-            beats = float(note.quarterLength)
-            seconds = beats * 60 / 120  # 假设默认速度为120
+            # 只解析一次 duration，类型和时值都从它读取
+            duration = note.duration
+            beats = float(duration.quarterLength)
+            seconds = beats * seconds_per_beat
             
-            return DurationInfo(type_name=dur_type), beats, seconds
+            return DurationManager.get_duration_info(duration.type, duration.dots), beats, seconds
         except Exception as e:
             logger.error(f"提取音符持续时间信息出错: {str(e)}")
             raise XMLConverterError(f"提取音符持续时间信息失败: {str(e)}")
\ No newline at end of file
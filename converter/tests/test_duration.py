@@ -0,0 +1,53 @@
+import music21
+
+from src.duration import DurationManager
+
+
+def _seconds(element):
+    return DurationManager.extract_duration_info(element)[2]
+
+
+def test_tempo_change_inside_measure_applies_to_voice_notes():
+    """速度标记在小节中、音符在声部中时，小节中途的速度变化必须生效"""
+    measure = music21.stream.Measure()
+    measure.insert(0, music21.tempo.MetronomeMark(number=60))
+    measure.insert(2, music21.tempo.MetronomeMark(number=120))
+    voice = music21.stream.Voice()
+    first = music21.note.Note('C4')
+    second = music21.note.Note('D4')
+    voice.insert(0, first)
+    voice.insert(3, second)
+    measure.insert(0, voice)
+    music21.stream.Part([measure])
+
+    assert [_seconds(first), _seconds(second)] == [1.0, 0.5]
+
+
+def test_tempo_is_shared_by_voice_notes_without_tempo_marks():
+    """小节内没有速度标记时，声部中的音符使用前一小节的速度"""
+    first_measure = music21.stream.Measure(number=1)
+    first_measure.insert(0, music21.tempo.MetronomeMark(number=90))
+    first_measure.append(music21.note.Rest(quarterLength=4))
+    second_measure = music21.stream.Measure(number=2)
+    voice = music21.stream.Voice()
+    notes = [music21.note.Note('C4'), music21.note.Note('E4')]
+    voice.append(notes)
+    second_measure.insert(0, voice)
+    part = music21.stream.Part()
+    part.append([first_measure, second_measure])
+
+    assert [_seconds(n) for n in notes] == [60 / 90, 60 / 90]
+
+
+def test_measure_with_tempo_mark_is_scanned_once():
+    """有速度标记的小节只记录一次标记，之后的查找不再重新扫描小节"""
+    measure = music21.stream.Measure()
+    measure.insert(0, music21.tempo.MetronomeMark(number=60))
+    notes = [music21.note.Note('C4'), music21.note.Note('E4')]
+    measure.insert(0, notes[0])
+    measure.insert(1, notes[1])
+    music21.stream.Part([measure])
+
+    assert [_seconds(n) for n in notes] == [1.0, 1.0]
+    assert measure in DurationManager._tempo_cache
+    assert DurationManager._tempo_cache[measure] is None